@@ -15,11 +15,15 @@ from __future__ import annotations
 import argparse
 import csv
 import json
+import os
 import re
 import sys
-from dataclasses import dataclass, field
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Tuple
 
 
 REQUIRED_FIELDS = ["work-id", "section_num", "page_url", "section_title", "section_url"]
@@ -32,15 +36,18 @@ class Row:
     section_num: str
     section_title: str
     url: str
+    path: Tuple[int, ...]
 
 
 @dataclass
-class Node:
+class Section:
+    """One section in flattened preorder; depth replaces a child-list tree."""
+
     key: str
-    section_num: str
+    depth: int
     title: str
     url: str
-    children: List["Node"] = field(default_factory=list)
+    has_children: bool = False
 
 
 def parse_args() -> argparse.Namespace:
@@ -62,7 +69,17 @@ def parse_args() -> argparse.Namespace:
     return parser.parse_args()
 
 
+try:
+    # The C string escaper json.dumps(..., ensure_ascii=False) dispatches to,
+    # minus the per-call encoder setup. Values here are always str.
+    from json.encoder import encode_basestring as _encode_str
+except ImportError:  # pragma: no cover
+    _encode_str = None
+
+
 def q(value: str) -> str:
+    if _encode_str is not None:
+        return _encode_str(value)
     return json.dumps(value, ensure_ascii=False)
 
 
@@ -70,34 +87,48 @@ def section_key(section_num: str) -> str:
     return "s" + "_".join(section_num.split("."))
 
 
+@lru_cache(maxsize=64)
 def normalize_field_name(name: str) -> str:
     return name.strip().lower().replace("_", "-").replace(" ", "-")
 
 
 def parse_csv(csv_path: Path) -> Dict[str, List[Row]]:
-    grouped: Dict[str, List[Row]] = {}
+    grouped: Dict[str, List[Row]] = defaultdict(list)
     with csv_path.open("r", encoding="utf-8-sig", newline="") as f:
-        reader = csv.DictReader(f)
-        if reader.fieldnames is None:
+        # csv.reader + integer indices: no per-row dict allocation or per-field
+        # hash lookup like DictReader does.
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
             raise ValueError("CSV has no header row.")
 
-        field_map = {normalize_field_name(name): name for name in reader.fieldnames}
-        missing = [name for name in REQUIRED_FIELDS if normalize_field_name(name) not in field_map]
+        index_map = {normalize_field_name(name): i for i, name in enumerate(header)}
+        missing = [name for name in REQUIRED_FIELDS if normalize_field_name(name) not in index_map]
         if missing:
             raise ValueError(f"Missing required CSV field(s): {', '.join(missing)}")
 
-        work_id_field = field_map[normalize_field_name("work-id")]
-        section_num_field = field_map[normalize_field_name("section_num")]
-        page_url_field = field_map[normalize_field_name("page_url")]
-        section_title_field = field_map[normalize_field_name("section_title")]
-        section_url_field = field_map[normalize_field_name("section_url")]
-
-        for i, raw in enumerate(reader, start=2):
-            work_id = (raw.get(work_id_field) or "").strip()
-            section_num = (raw.get(section_num_field) or "").strip().rstrip(".")
-            section_title = (raw.get(section_title_field) or "").strip()
-            section_url = (raw.get(section_url_field) or "").strip()
-            page_url = (raw.get(page_url_field) or "").strip()
+        work_id_idx = index_map[normalize_field_name("work-id")]
+        section_num_idx = index_map[normalize_field_name("section_num")]
+        page_url_idx = index_map[normalize_field_name("page_url")]
+        section_title_idx = index_map[normalize_field_name("section_title")]
+        section_url_idx = index_map[normalize_field_name("section_url")]
+        n_fields = len(header)
+
+        # Rows usually arrive grouped by work, so keep the bound append for
+        # the current work instead of re-hashing the key on every row.
+        last_work_id = None
+        append_row = None
+
+        for i, row in enumerate(reader, start=2):
+            if not row:
+                continue
+            if len(row) < n_fields:
+                row.extend([""] * (n_fields - len(row)))
+            work_id = row[work_id_idx].strip()
+            section_num = row[section_num_idx].strip().rstrip(".")
+            section_title = row[section_title_idx].strip()
+            section_url = row[section_url_idx].strip()
+            page_url = row[page_url_idx].strip()
 
             if not work_id:
                 raise ValueError(f"Row {i}: `work-id` is required.")
@@ -115,91 +146,102 @@ def parse_csv(csv_path: Path) -> Dict[str, List[Row]]:
                     f"Row {i}: provide either `section_url` or `page_url`."
                 )
 
-            grouped.setdefault(work_id, []).append(
+            if work_id != last_work_id:
+                last_work_id = work_id
+                append_row = grouped[work_id].append
+            append_row(
                 Row(
                     work_id=work_id,
                     section_num=section_num,
                     section_title=section_title,
                     url=url,
+                    # Parsed once here; build_sections reuses it for sorting and
+                    # parent lookups instead of re-splitting the string.
+                    path=tuple(int(part) for part in section_num.split(".")),
                 )
             )
     return grouped
 
 
-def sort_key(section_num: str) -> Tuple[int, ...]:
-    return tuple(int(part) for part in section_num.split("."))
-
-
-def build_tree(rows: List[Row]) -> List[Node]:
-    rows_sorted = sorted(rows, key=lambda r: sort_key(r.section_num))
-    nodes: Dict[Tuple[int, ...], Node] = {}
-    roots: List[Node] = []
+def build_sections(rows: List[Row]) -> List[Section]:
+    # Rows sorted by path tuple are already in preorder, so the hierarchy
+    # flattens to one Section per row plus a depth — no per-node child lists.
+    rows_sorted = sorted(rows, key=lambda r: r.path)
+    seen = set()
+    sections: List[Section] = []
 
     for row in rows_sorted:
-        path = sort_key(row.section_num)
-        if path in nodes:
+        path = row.path
+        if path in seen:
             raise ValueError(f"Duplicate `section_num` detected: {row.section_num}")
+        seen.add(path)
 
-        node = Node(
-            key=section_key(row.section_num),
-            section_num=row.section_num,
-            title=row.section_title,
-            url=row.url,
-        )
-        nodes[path] = node
-
-        if len(path) == 1:
-            roots.append(node)
-            continue
-
-        parent_path = path[:-1]
-        parent = nodes.get(parent_path)
-        if parent is None:
+        if len(path) > 1 and path[:-1] not in seen:
             raise ValueError(
-                f"Missing parent for section {row.section_num}. Expected parent {'.'.join(str(i) for i in parent_path)}."
+                f"Missing parent for section {row.section_num}. Expected parent {'.'.join(str(i) for i in path[:-1])}."
             )
-        parent.children.append(node)
 
-    return roots
+        sections.append(
+            Section(
+                key=section_key(row.section_num),
+                depth=len(path) - 1,
+                title=row.section_title,
+                url=row.url,
+            )
+        )
+
+    # In preorder, a section has children exactly when its successor is deeper.
+    for prev, nxt in zip(sections, sections[1:]):
+        if nxt.depth > prev.depth:
+            prev.has_children = True
+
+    return sections
 
 
-def emit_sections(nodes: List[Node], indent: str = "") -> List[str]:
-    lines: List[str] = []
-    for node in nodes:
-        lines.append(f"{indent}- {node.key}: {q(node.title)}")
-        if node.children:
-            lines.append(f"{indent}  sections:")
-            lines.extend(emit_sections(node.children, indent + "    "))
-    return lines
+def emit_sections(sections: List[Section], indent: str = "") -> Iterator[str]:
+    # Indent strings are built once per depth, not per section.
+    indents = [indent]
+    for sec in sections:
+        while len(indents) <= sec.depth:
+            indents.append(indents[-1] + "    ")
+        pad = indents[sec.depth]
+        yield f"{pad}- {sec.key}: {q(sec.title)}"
+        if sec.has_children:
+            yield f"{pad}  sections:"
 
 
-def collect_preorder(nodes: List[Node]) -> List[Node]:
-    result: List[Node] = []
-    for node in nodes:
-        result.append(node)
-        result.extend(collect_preorder(node.children))
-    return result
+def write_snippet(sections: List[Section], fh) -> None:
+    # Lines go straight to the (buffered) file object; no per-work list of
+    # lines or joined string is ever materialized.
+    write = fh.write
+    write("sections:\n")
+    for line in emit_sections(sections, indent="  "):
+        write(line)
+        write("\n")
+    write("section_urls:\n")
+    for sec in sections:
+        write(f"  - {sec.key}: {q(sec.url)}\n")
 
 
-def render_snippet(roots: List[Node]) -> str:
-    lines: List[str] = ["sections:"]
-    lines.extend(emit_sections(roots, indent="  "))
-    lines.append("section_urls:")
-    for node in collect_preorder(roots):
-        lines.append(f"  - {node.key}: {q(node.url)}")
-    lines.append("")
-    return "\n".join(lines)
+def write_one_output(work_id: str, rows: List[Row], works_dir: Path, suffix: str) -> None:
+    sections = build_sections(rows)
+    out_path = works_dir / f"{work_id}{suffix}"
+    with out_path.open("w", encoding="utf-8") as fh:
+        write_snippet(sections, fh)
 
 
 def write_outputs(grouped_rows: Dict[str, List[Row]], works_dir: Path, suffix: str) -> int:
     works_dir.mkdir(parents=True, exist_ok=True)
-    count = 0
-    for work_id in sorted(grouped_rows.keys()):
-        roots = build_tree(grouped_rows[work_id])
-        out_path = works_dir / f"{work_id}{suffix}"
-        out_path.write_text(render_snippet(roots), encoding="utf-8")
-        count += 1
-    return count
+    work_ids = sorted(grouped_rows.keys())
+    # Each work is independent, so tree building overlaps with disk writes.
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+        futures = [
+            pool.submit(write_one_output, work_id, grouped_rows[work_id], works_dir, suffix)
+            for work_id in work_ids
+        ]
+        for future in futures:
+            future.result()
+    return len(work_ids)
 
 
 def main() -> int:
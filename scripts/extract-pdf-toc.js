@@ -4,7 +4,6 @@
 // Output: JSON array of {title, page, depth, children[]}
 
 const fs = require("fs");
-const { PDFParse } = require("pdf-parse");
 
 async function main() {
   const pdfPath = process.argv[2];
@@ -30,6 +29,9 @@ async function main() {
     }
     dataBuffer = new Uint8Array(fs.readFileSync(pdfPath));
   }
+  // Required lazily so usage errors and bad paths exit without paying
+  // pdf-parse's startup cost
+  const { PDFParse } = require("pdf-parse");
   const parser = new PDFParse(dataBuffer);
   await parser.load();
   const info = await parser.getInfo();
@@ -5,6 +5,19 @@ const yaml = require("js-yaml");
 const WORKS_DIR = path.resolve(__dirname, "../works");
 const CACHE_DIR = path.resolve(__dirname, "../_cache/authors");
 
+const CONCURRENCY = 4;
+const REQUEST_DELAY_MS = 500; // minimum spacing between fetches, shared across workers
+
+// Token bucket: workers overlap network latency but the aggregate request
+// rate to Wikidata stays at one author per REQUEST_DELAY_MS.
+let nextSlot = Date.now();
+function waitRateSlot() {
+  const now = Date.now();
+  const wait = Math.max(0, nextSlot - now);
+  nextSlot = Math.max(nextSlot, now) + REQUEST_DELAY_MS;
+  return new Promise((resolve) => setTimeout(resolve, wait));
+}
+
 function isQid(s) {
   return typeof s === "string" && /^Q\d+$/.test(s);
 }
@@ -115,28 +128,38 @@ async function main() {
   const qids = collectQids();
   console.log(`Found ${qids.length} unique authors`);
 
-  for (const qid of qids) {
+  async function processQid(qid) {
     const cachePath = path.join(CACHE_DIR, `${qid}.json`);
     if (fs.existsSync(cachePath)) {
       // Check if cache has the new fields; if not, re-fetch
       const cached = JSON.parse(fs.readFileSync(cachePath, "utf8"));
       if (cached._cacheVersion >= 5) {
         console.log(`  ${qid} — cached`);
-        continue;
+        return;
       }
       console.log(`  ${qid} — re-fetching (missing new fields)...`);
     }
     try {
+      // Be polite to Wikidata: uncached fetches wait for a rate slot
+      await waitRateSlot();
       console.log(`  ${qid} — fetching...`);
       const data = await fetchAuthor(qid);
       fs.writeFileSync(cachePath, JSON.stringify(data, null, 2));
       console.log(`  ${qid} — ${data.name}`);
-      // Be polite to Wikidata
-      await new Promise((r) => setTimeout(r, 500));
     } catch (err) {
       console.error(`  ${qid} — ERROR: ${err.message}`);
     }
   }
+
+  // Small worker pool: cached authors fly by, uncached ones overlap their
+  // network latency while the token bucket caps the request rate.
+  const queue = [...qids];
+  const workers = Array.from({ length: CONCURRENCY }, async () => {
+    while (queue.length > 0) {
+      await processQid(queue.shift());
+    }
+  });
+  await Promise.all(workers);
   console.log("Done.");
 }
 
@@ -120,8 +120,7 @@ async function downloadXml(url, cachePath) {
   const text = await res.text();
   console.error(`  Downloaded ${text.length} characters`);
 
-  // Cache for future runs
-  fs.mkdirSync(path.dirname(cachePath), { recursive: true });
+  // Cache for future runs (CACHE_DIR is created once in main)
   fs.writeFileSync(cachePath, text, "utf8");
   console.error(`  Cached to ${cachePath}`);
 
@@ -3,7 +3,6 @@
 // Usage: node scripts/import-work.js <pdf-url> [--author Q123] [--id work-id] [--depth N] [--lang la]
 
 const fs = require("fs");
-const { PDFParse } = require("pdf-parse");
 
 function parseArgs(argv) {
   const args = { url: null, author: null, id: null, depth: Infinity, lang: "la" };
@@ -76,6 +75,9 @@ async function loadPdf(urlOrPath) {
 }
 
 async function extractOutline(dataBuffer) {
+  // Required lazily so usage errors and bad paths exit without paying
+  // pdf-parse's startup cost
+  const { PDFParse } = require("pdf-parse");
   const parser = new PDFParse(dataBuffer);
   await parser.load();
   const info = await parser.getInfo();
@@ -1,128 +1,216 @@
 import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+from requests.adapters import HTTPAdapter
+import lxml.html
+from lxml import etree
+from urllib.parse import urljoin, urlsplit
 import csv
+import hashlib
+import re
+import threading
 import xml.etree.ElementTree as ET
-from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
+from pathlib import Path
 import time
 
 START_URL = "https://confessionallyreformed.wordpress.com/"
 SITEMAP_URL = START_URL + "sitemap.xml"
-DOMAIN = urlparse(START_URL).netloc
+DOMAIN = urlsplit(START_URL).netloc.lower()
 
 SKIP_PATTERNS = ["/topics/", "/categories/", "?like_comment"]
+SKIP_RE = re.compile("|".join(re.escape(pat) for pat in SKIP_PATTERNS))
 
 # --- DEBUG MODE ---
 DEBUG_ONE_PAGE = False   # set False to crawl whole site
 
+MAX_WORKERS = 8
+REQUEST_DELAY = 0.5      # minimum spacing between requests, shared across workers
+
+# Pages are cached on disk like the other importers do (_cache/ccel,
+# _cache/earlyprint), so re-runs while iterating on parsing skip the network.
+CACHE_DIR = Path(__file__).resolve().parent.parent / "_cache" / "crtoc"
+
 visited = set()
 results = []
 
+# One session with keep-alive so workers reuse TCP/TLS connections
+session = requests.Session()
+session.headers["User-Agent"] = "Mozilla/5.0 (compatible; TOC-Crawler/1.0)"
+session.mount(
+    "https://",
+    HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS * 2),
+)
+
 # Seed queue from sitemap to discover all pages
 print(f"Fetching sitemap: {SITEMAP_URL}")
 try:
-    sitemap_resp = requests.get(SITEMAP_URL, headers={"User-Agent": "Mozilla/5.0"}, timeout=10)
+    sitemap_resp = session.get(SITEMAP_URL, timeout=10, stream=True)
     sitemap_resp.raise_for_status()
-    root = ET.fromstring(sitemap_resp.text)
-    ns = {"s": "http://www.sitemaps.org/schemas/sitemap/0.9"}
-    sitemap_urls = [loc.text for loc in root.findall(".//s:loc", ns)]
+    sitemap_resp.raw.decode_content = True  # undo any transport gzip for the parser
+    # Stream <loc> elements as the body arrives instead of building the full DOM
+    sitemap_urls = []
+    for _, elem in ET.iterparse(sitemap_resp.raw):
+        if elem.tag.endswith("}loc") or elem.tag == "loc":
+            if elem.text:
+                sitemap_urls.append(elem.text.strip())
+        elem.clear()
     print(f"  Found {len(sitemap_urls)} URLs in sitemap")
 except Exception as e:
     print(f"  Failed to fetch sitemap: {e}, falling back to homepage")
     sitemap_urls = [START_URL]
 
-queue = deque(sitemap_urls)
-
+# The same URLs (home, nav, recent posts) reappear on nearly every page, so
+# memoize the per-URL checks and the join instead of re-parsing each time.
+@lru_cache(maxsize=4096)
 def is_internal(url):
-    parsed = urlparse(url)
-    return parsed.netloc == DOMAIN or parsed.netloc == ""
+    # urlsplit skips the params handling urlparse does; links are either
+    # relative (empty netloc) or on our own host.
+    netloc = urlsplit(url).netloc
+    return not netloc or netloc.lower() == DOMAIN
 
+@lru_cache(maxsize=4096)
 def should_skip(url):
-    return any(pat in url for pat in SKIP_PATTERNS)
-
-def walk_toc_list(ol_or_ul, prefix=""):
-    """Walk nested ol/ul TOC lists, yielding (section_num, text, href) tuples."""
-    counter = 0
-    for li in ol_or_ul.find_all("li", recursive=False):
-        counter += 1
-        section_num = f"{prefix}{counter}" if prefix else str(counter)
-
-        a = li.find("a", class_="wp-block-table-of-contents__entry", recursive=False)
-        if a:
-            text = a.get_text(strip=True)
-            href = a.get("href", "")
-            yield (section_num, text, href)
+    return SKIP_RE.search(url) is not None
 
-        # Recurse into nested lists
-        nested = li.find(["ol", "ul"], recursive=False)
-        if nested:
-            yield from walk_toc_list(nested, prefix=section_num + ".")
+@lru_cache(maxsize=4096)
+def join_url(base, href):
+    return urljoin(base, href)
 
-headers = {
-    "User-Agent": "Mozilla/5.0 (compatible; TOC-Crawler/1.0)"
-}
+# Compiled once at import; the per-page traversal then runs in libxml2
+# instead of a Python-level recursive walk.
+TOC_NAV_XPATH = etree.XPath("//nav[contains(@class, 'wp-block-table-of-contents')]")
+TOC_ENTRY_XPATH = etree.XPath("//a[contains(@class, 'wp-block-table-of-contents__entry')]")
+TOC_ENTRY_REL_XPATH = etree.XPath(
+    ".//li/a[contains(@class, 'wp-block-table-of-contents__entry')]"
+)
+FIRST_LIST_XPATH = etree.XPath("(.//ol | .//ul)[1]")
+ANCESTOR_LIST_XPATH = etree.XPath("ancestor::ol | ancestor::ul")
+LINK_XPATH = etree.XPath("//a[@href]")
 
-while queue:
-    url = queue.popleft()
-
-    if url in visited or should_skip(url):
-        continue
-
-    print(f"\nScraping: {url}")
 
+def walk_toc_list(top_list):
+    """Walk nested ol/ul TOC lists, yielding (section_num, text, href) tuples."""
+    # One XPath pass grabs every entry anchor in document order; the section
+    # number is rebuilt from the 1-based position of each ancestor <li>.
+    for a in TOC_ENTRY_REL_XPATH(top_list):
+        parts = []
+        el = a.getparent()  # the <li> holding the anchor
+        while el is not None and el is not top_list:
+            if el.tag == "li":
+                pos = 1
+                for _ in el.itersiblings("li", preceding=True):
+                    pos += 1
+                parts.append(str(pos))
+            el = el.getparent()
+        section_num = ".".join(reversed(parts))
+        yield (section_num, a.text_content().strip(), a.get("href", ""))
+
+
+def find_toc_list(doc):
+    """Find the list containing TOC entries (may be in a <nav> or directly in content)."""
+    navs = TOC_NAV_XPATH(doc)
+    if navs:
+        lists = FIRST_LIST_XPATH(navs[0])
+        return lists[0] if lists else None
+    # Otherwise take the outermost ol/ul wrapping the first TOC entry link
+    entries = TOC_ENTRY_XPATH(doc)
+    if entries:
+        ancestors = ANCESTOR_LIST_XPATH(entries[0])
+        return ancestors[0] if ancestors else None
+    return None
+
+# Token bucket shared by all workers: keeps the aggregate request rate at
+# one request per REQUEST_DELAY even with MAX_WORKERS requests in flight.
+_rate_lock = threading.Lock()
+_next_allowed = 0.0
+
+def wait_rate_slot():
+    global _next_allowed
+    with _rate_lock:
+        now = time.monotonic()
+        delay = _next_allowed - now
+        _next_allowed = max(_next_allowed, now) + REQUEST_DELAY
+    if delay > 0:
+        time.sleep(delay)
+
+def fetch_page(url):
+    """Return the page body, from _cache/crtoc when available."""
+    cache_path = CACHE_DIR / (hashlib.sha1(url.encode("utf-8")).hexdigest() + ".html")
+    if cache_path.exists():
+        return cache_path.read_bytes()
+
+    # Only uncached fetches count against the polite request rate
+    wait_rate_slot()
+    resp = session.get(url, timeout=10)
+    resp.raise_for_status()
+    cache_path.write_bytes(resp.content)
+    return resp.content
+
+
+def fetch_and_parse(url):
+    """Fetch one page; return its TOC entries and discovered internal links."""
     try:
-        resp = requests.get(url, headers=headers, timeout=10)
-        resp.raise_for_status()
+        content = fetch_page(url)
     except Exception as e:
         print(f"Failed to fetch {url}: {e}")
-        continue
-
-    visited.add(url)
-
-    soup = BeautifulSoup(resp.text, "html.parser")
-
-    # Find the list containing TOC entries (may be in a <nav> or directly in content)
-    toc_nav = soup.find("nav", class_="wp-block-table-of-contents")
-    if toc_nav:
-        top_list = toc_nav.find(["ol", "ul"])
-    else:
-        # Find the first ul/ol that contains a TOC entry link
-        first_entry = soup.select_one("a.wp-block-table-of-contents__entry")
-        if first_entry:
-            top_list = first_entry.find_parent(["ol", "ul"])
-            # Walk up to the outermost list (skip nested sub-lists)
-            while top_list:
-                parent_list = top_list.find_parent(["ol", "ul"])
-                if parent_list and parent_list.find("a", class_="wp-block-table-of-contents__entry"):
-                    top_list = parent_list
-                else:
-                    break
-        else:
-            top_list = None
-
-    if top_list:
-        entries = list(walk_toc_list(top_list))
-        print(f"  Found {len(entries)} TOC entries")
-        for section_num, text, href in entries:
-            entry_url = urljoin(url, href)
-            results.append(["", section_num, url, text, entry_url])
-            print(f"    {section_num} → {text[:60]}")
+        return [], []
 
-    # --- stop early if debugging one page ---
-    if DEBUG_ONE_PAGE:
-        break
+    doc = lxml.html.fromstring(content)
 
-    # --- Enqueue other internal links ---
-    for link in soup.find_all("a", href=True):
-        next_url = urljoin(url, link["href"])
-
-        if "#" in next_url:
-            next_url = next_url.split("#")[0]
-
-        if is_internal(next_url) and next_url not in visited and not should_skip(next_url):
-            queue.append(next_url)
+    entries = []
+    top_list = find_toc_list(doc)
+    if top_list is not None:
+        entries = list(walk_toc_list(top_list))
 
-    time.sleep(0.5)
+    # Dict-as-ordered-set: nav menus repeat the same links many times per
+    # page, so dedupe here before the URLs hit the shared visited set.
+    discovered = {}
+    for link in LINK_XPATH(doc):
+        href = link.get("href")
+        if not href:
+            continue
+        next_url = join_url(url, href).partition("#")[0]
+
+        if is_internal(next_url):
+            discovered[next_url] = None
+
+    return entries, list(discovered)
+
+CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+    pending = {}
+
+    def submit(url):
+        if url in visited or should_skip(url):
+            return
+        visited.add(url)
+        pending[pool.submit(fetch_and_parse, url)] = url
+
+    for url in (sitemap_urls[:1] if DEBUG_ONE_PAGE else sitemap_urls):
+        submit(url)
+
+    while pending:
+        done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+        for fut in done:
+            url = pending.pop(fut)
+            entries, discovered = fut.result()
+
+            print(f"\nScraped: {url}")
+            if entries:
+                print(f"  Found {len(entries)} TOC entries")
+            for section_num, text, href in entries:
+                entry_url = urljoin(url, href)
+                results.append(["", section_num, url, text, entry_url])
+                print(f"    {section_num} → {text[:60]}")
+
+            # --- stop early if debugging one page ---
+            if DEBUG_ONE_PAGE:
+                continue
+
+            # --- Enqueue other internal links ---
+            for next_url in discovered:
+                submit(next_url)
 
 # --- Write CSV ---
 with open("crtoc_entries.csv", "w", newline="", encoding="utf-8") as f:
@@ -11,6 +11,13 @@
     // lociFlat is injected by the template as a global variable
     const flat = typeof lociFlat !== "undefined" ? lociFlat : {};
 
+    // Lowercase the names once up front; getMatchingSlugs runs on every
+    // keystroke, so it shouldn't re-lowercase the whole tree each time
+    const loweredNames = {};
+    for (const slug in flat) {
+      loweredNames[slug] = flat[slug].name.toLowerCase();
+    }
+
     function getMatchingSlugs(query) {
       if (!query) return null; // null means show everything
       const q = query.toLowerCase().trim();
@@ -18,7 +25,7 @@
 
       const matched = new Set();
       for (const slug in flat) {
-        const name = flat[slug].name.toLowerCase();
+        const name = loweredNames[slug];
         if (name.includes(q) || slug.includes(q)) {
           matched.add(slug);
           // Add all descendants